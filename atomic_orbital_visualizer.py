@@ -1,7 +1,7 @@
 """
 Produces an ASCII-based animation of the atomic orbital in the command line.
 
-Each frame is a cross-section of the orbital. As the animation progresses, the user is taken from one end of the atom to the other.
+Each frame is a cross-section of the orbital, drawn over the previous one using ANSI escape sequences. As the animation progresses, the user is taken from one end of the atom to the other.
 
 The values displayed correspond to probability. The wavefunction is calculated by multiplying the value of the spherical harmonic at each point in 3D Cartesian space by an exponential radial decay factor; the wavefunction is then squared to yield probability.
 
@@ -25,169 +25,132 @@ Inputs:
 
 There is no support for quantum number n.
 
+NumPy is required; the probability at every point of the animation is calculated once, in array operations, before the first frame is drawn, and each cross-section is sliced out of the result.
+
 For aesthetically pleasing visualizations, a bounding interval of [-10,10] on each axis is recommended, along with a radial decay factor of 0.08.
 """
 
-import math,time
-
-"""Calculates the real value of a spherical harmonic at a point (x,y,z) in 3D Cartesian space given principle quantum numbers l (angular momentum) and m (spin angular momentum). Returns a tuple containing the textual symbol of the atomic orbital as well as the calculated value."""
-def real_spherical_harmonic_lookup(l,m,x,y,z):
-	#Calculates distance of point (x,y,z) from the origin.
-	r=math.sqrt(float(x**2)+float(y**2)+float(z**2))
+import math,sys,time
+import numpy as np
+
+#Maps each pair of l and m to the textual symbol of the atomic orbital, the normalization constant of the corresponding real spherical harmonic, and its angular dependence as a function of (x,y,z) and the distance r from the origin. Normalization constants are evaluated once, at import.
+SPHERICAL_HARMONICS={
+	(0,0):("s",0.5*math.sqrt(1.0/math.pi),lambda x,y,z,r:1.0),
+	(1,-1):("p_y",math.sqrt(3.0/(4.0*math.pi)),lambda x,y,z,r:y/r),
+	(1,0):("p_z",math.sqrt(3.0/(4.0*math.pi)),lambda x,y,z,r:z/r),
+	(1,1):("p_x",math.sqrt(3.0/(4.0*math.pi)),lambda x,y,z,r:x/r),
+	(2,-2):("d_xy",0.5*math.sqrt(15.0/math.pi),lambda x,y,z,r:(x*y)/(r**2)),
+	(2,-1):("d_yz",0.5*math.sqrt(15.0/math.pi),lambda x,y,z,r:(y*z)/(r**2)),
+	(2,0):("d_z^2",0.25*math.sqrt(5.0/math.pi),lambda x,y,z,r:((-(x**2))-(y**2)+(2*(z**2)))/(r**2)),
+	(2,1):("d_xz",0.5*math.sqrt(15.0/math.pi),lambda x,y,z,r:(x*z)/(r**2)),
+	(2,2):("d_x^2-y^2",0.25*math.sqrt(15.0/math.pi),lambda x,y,z,r:((x**2)-(y**2))/(r**2)),
+	(3,-3):("f_y(3x^2-y^2)",0.25*math.sqrt(35.0/(2*math.pi)),lambda x,y,z,r:(((3*(x**2))-(y**2))*y)/(r**3)),
+	(3,-2):("f_xyz",0.5*math.sqrt(105.0/math.pi),lambda x,y,z,r:(x*y*z)/(r**3)),
+	(3,-1):("f_yz^2",0.25*math.sqrt(21.0/(2*math.pi)),lambda x,y,z,r:(((4*(z**2))-(x**2)-(y**2))*y)/(r**3)),
+	(3,0):("f_z^3",0.25*math.sqrt(7.0/math.pi),lambda x,y,z,r:(((2*(z**2))-(3*(x**2))-(3*(y**2)))*z)/(r**3)),
+	(3,1):("f_xz^2",0.25*math.sqrt(21.0/(2*math.pi)),lambda x,y,z,r:(((4*(z**2))-(x**2)-(y**2))*x)/(r**3)),
+	(3,2):("f_z(x^2-y^2)",0.25*math.sqrt(105.0/math.pi),lambda x,y,z,r:(((x**2)-(y**2))*z)/(r**3)),
+	(3,3):("f_x(x^2-3y^2)",0.25*math.sqrt(35.0/(2*math.pi)),lambda x,y,z,r:(((x**2)-(3*(y**2)))*x)/(r**3)),
+	(4,-4):("g_xy(x^2-y^2)",0.75*math.sqrt(35.0/math.pi),lambda x,y,z,r:((x*y)*((x**2)-(y**2)))/(r**4)),
+	(4,-3):("g_zy^3",0.75*math.sqrt(35.0/(2*math.pi)),lambda x,y,z,r:((y*z)*((3*(x**2))-(y**2)))/(r**4)),
+	(4,-2):("g_z^2xy",0.75*math.sqrt(5.0/math.pi),lambda x,y,z,r:((x*y)*((7*(z**2))-(r**2)))/(r**4)),
+	(4,-1):("g_z^3y",0.75*math.sqrt(5.0/(2*math.pi)),lambda x,y,z,r:((y*z)*((7*(z**2))-(3*(r**2))))/(r**4)),
+	(4,0):("g_z^4",0.1875*math.sqrt(1.0/math.pi),lambda x,y,z,r:((35*(z**4))-(30*(z**2)*(r**2))+(3*(r**4)))/(r**4)),
+	(4,1):("g_z^3x",0.75*math.sqrt(5.0/(2*math.pi)),lambda x,y,z,r:((x*z)*((7*(z**2))-(3*(r**2))))/(r**4)),
+	(4,2):("g_z^2(x^2-y^2)",0.375*math.sqrt(5.0/math.pi),lambda x,y,z,r:(((x**2)-(y**2))*((7*(z**2))-(r**2)))/(r**4)),
+	(4,3):("g_zx^3",0.75*math.sqrt(35.0/(2*math.pi)),lambda x,y,z,r:(((x**2)-(3*(y**2)))*(x*z))/(r**4)),
+	(4,4):("g_x^4+y^4",0.1875*math.sqrt(35.0/math.pi),lambda x,y,z,r:(((x**2)*((x**2)-(3*(y**2))))-((y**2)*((3*(x**2))-(y**2))))/(r**4)),
+}
+
+#Defines the ASCII characters which encode different probability levels. A probability is encoded by the character of the highest level it meets or exceeds; levels must be in ascending order.
+PROBABILITY_LEVELS=np.array([0.0,0.05,0.1,0.15,0.2])
+PROBABILITY_CHARACTERS=np.array([b" ",b".",b"o",b"O",b"$"])
+
+"""Calculates the real value of a spherical harmonic at each point of the arrays (x,y,z) in 3D Cartesian space given principle quantum numbers l (angular momentum) and m (spin angular momentum). r holds the distance of each point from the origin and must be nonzero. Returns a tuple containing the textual symbol of the atomic orbital as well as the calculated values."""
+def real_spherical_harmonic_lookup(l,m,x,y,z,r):
 	#Looks up appropriate formula to use given l and m, and then calculates the value.
-	if ((l==0) and (m==0)):
-		atomic_orbital_symbol="s"
-		spherical_harmonic=0.5*math.sqrt(1.0/math.pi)
-	elif ((l==1) and (m==-1)):
-		atomic_orbital_symbol="p_y"
-		spherical_harmonic=math.sqrt(3.0/(4.0*math.pi))*(y/r)
-	elif ((l==1) and (m==0)):
-		atomic_orbital_symbol="p_z"
-		spherical_harmonic=math.sqrt(3.0/(4.0*math.pi))*(z/r)
-	elif ((l==1) and (m==1)):
-		atomic_orbital_symbol="p_x"
-		spherical_harmonic=math.sqrt(3.0/(4.0*math.pi))*(x/r)
-	elif ((l==2) and (m==-2)):
-		atomic_orbital_symbol="d_xy"
-		spherical_harmonic=0.5*math.sqrt(15.0/math.pi)*((x*y)/(r**2))
-	elif ((l==2) and (m==-1)):
-		atomic_orbital_symbol="d_yz"
-		spherical_harmonic=0.5*math.sqrt(15.0/math.pi)*((y*z)/(r**2))
-	elif ((l==2) and (m==0)):
-		atomic_orbital_symbol="d_z^2"
-		spherical_harmonic=0.25*math.sqrt(5.0/math.pi)*(((-(x**2))-(y**2)+(2*(z**2)))/(r**2))
-	elif ((l==2) and (m==1)):
-		atomic_orbital_symbol="d_xz"
-		spherical_harmonic=0.5*math.sqrt(15.0/math.pi)*((x*z)/(r**2))
-	elif ((l==2) and (m==2)):
-		atomic_orbital_symbol="d_x^2-y^2"
-		spherical_harmonic=0.25*math.sqrt(15.0/math.pi)*(((x**2)-(y**2))/(r**2))
-	elif ((l==3) and (m==-3)):
-		atomic_orbital_symbol="f_y(3x^2-y^2)"
-		spherical_harmonic=0.25*math.sqrt(35.0/(2*math.pi))*((((3*(x**2))-(y**2))*y)/(r**3))
-	elif ((l==3) and (m==-2)):
-		atomic_orbital_symbol="f_xyz"
-		spherical_harmonic=0.5*math.sqrt(105.0/math.pi)*((x*y*z)/(r**3))
-	elif ((l==3) and (m==-1)):
-		atomic_orbital_symbol="f_yz^2"
-		spherical_harmonic=0.25*math.sqrt(21.0/(2*math.pi))*((((4*(z**2))-(x**2)-(y**2))*y)/(r**3))
-	elif ((l==3) and (m==0)):
-		atomic_orbital_symbol="f_z^3"
-		spherical_harmonic=0.25*math.sqrt(7.0/math.pi)*((((2*(z**2))-(3*(x**2))-(3*(y**2)))*z)/(r**3))
-	elif ((l==3) and (m==1)):
-		atomic_orbital_symbol="f_xz^2"
-		spherical_harmonic=0.25*math.sqrt(21.0/(2*math.pi))*((((4*(z**2))-(x**2)-(y**2))*x)/(r**3))
-	elif ((l==3) and (m==2)):
-		atomic_orbital_symbol="f_z(x^2-y^2)"
-		spherical_harmonic=0.25*math.sqrt(105.0/math.pi)*((((x**2)-(y**2))*z)/(r**3))
-	elif ((l==3) and (m==3)):
-		atomic_orbital_symbol="f_x(x^2-3y^2)"
-		spherical_harmonic=0.25*math.sqrt(35.0/(2*math.pi))*((((x**2)-(3*(y**2)))*x)/(r**3))
-	elif ((l==4) and (m==-4)):
-		atomic_orbital_symbol="g_xy(x^2-y^2)"
-		spherical_harmonic=0.75*math.sqrt(35.0/math.pi)*(((x*y)*((x**2)-(y**2)))/(r**4))
-	elif ((l==4) and (m==-3)):
-		atomic_orbital_symbol="g_zy^3"
-		spherical_harmonic=0.75*math.sqrt(35.0/(2*math.pi))*(((y*z)*((3*(x**2))-(y**2)))/(r**4))
-	elif ((l==4) and (m==-2)):
-		atomic_orbital_symbol="g_z^2xy"
-		spherical_harmonic=0.75*math.sqrt(5.0/math.pi)*(((x*y)*((7*(z**2))-(r**2)))/(r**4))
-	elif ((l==4) and (m==-1)):
-		atomic_orbital_symbol="g_z^3y"
-		spherical_harmonic=0.75*math.sqrt(5.0/(2*math.pi))*(((y*z)*((7*(z**2))-(3*(r**2))))/(r**4))
-	elif ((l==4) and (m==0)):
-		atomic_orbital_symbol="g_z^4"
-		spherical_harmonic=0.1875*math.sqrt(1.0/math.pi)*(((35*(z**4))-(30*(z**2)*(r**2))+(3*(r**4)))/(r**4))
-	elif ((l==4) and (m==1)):
-		atomic_orbital_symbol="g_z^3x"
-		spherical_harmonic=0.75*math.sqrt(5.0/(2*math.pi))*(((x*z)*((7*(z**2))-(3*(r**2))))/(r**4))
-	elif ((l==4) and (m==2)):
-		atomic_orbital_symbol="g_z^2(x^2-y^2)"
-		spherical_harmonic=0.375*math.sqrt(5.0/math.pi)*((((x**2)-(y**2))*((7*(z**2))-(r**2)))/(r**4))
-	elif ((l==4) and (m==3)):
-		atomic_orbital_symbol="g_zx^3"
-		spherical_harmonic=0.75*math.sqrt(35.0/(2*math.pi))*((((x**2)-(3*(y**2)))*(x*z))/(r**4))
-	elif ((l==4) and (m==4)):
-		atomic_orbital_symbol="g_x^4+y^4"
-		spherical_harmonic=0.1875*math.sqrt(35.0/math.pi)*((((x**2)*((x**2)-(3*(y**2))))-((y**2)*((3*(x**2))-(y**2))))/(r**4))
+	atomic_orbital_symbol,normalization_constant,angular_dependence=SPHERICAL_HARMONICS[(l,m)]
+	spherical_harmonic=normalization_constant*angular_dependence(x,y,z,r)
 	#Returns atomic orbital symbol and calculated spherical harmonic value.
 	return atomic_orbital_symbol,spherical_harmonic
 
+"""
+Calculates the probability at each point of the 3D grid spanned by the 1D coordinate arrays x, y, and z. Returns an array indexed by [x,y,z].
+
+The probability at every point is calculated up front, so that distances and radial decay are evaluated once for the whole animation rather than once per frame. Probability is symmetric under reflection across each axis, so it is only calculated at the distinct absolute coordinates of the grid, and then mirrored into place.
+"""
+def calculate_probability(l,m,x,y,z,radial_decay_factor):
+	#Folds each axis onto its distinct absolute coordinates, keeping the indices which mirror them back.
+	x_folded,x_mirror=np.unique(np.abs(x),return_inverse=True)
+	y_folded,y_mirror=np.unique(np.abs(y),return_inverse=True)
+	z_folded,z_mirror=np.unique(np.abs(z),return_inverse=True)
+	x_folded,y_folded,z_folded=np.meshgrid(x_folded,y_folded,z_folded,indexing="ij")
+	#Calculates distance of each point from the origin. The nucleus is assigned a distance of 1 to avoid division by zero; it is identified separately in the frame.
+	r=np.sqrt(x_folded**2+y_folded**2+z_folded**2)
+	r[r==0]=1.0
+	#Looks up the value of the spherical harmonic at each point.
+	spherical_harmonic_value=real_spherical_harmonic_lookup(l,m,x_folded,y_folded,z_folded,r)[1]
+	#Calculates the probability at each point. The radial decay is calculated in place in a single buffer, which then receives the product and its square, avoiding intermediate arrays.
+	probability=np.multiply(r,-radial_decay_factor)
+	np.exp(probability,out=probability)
+	np.multiply(probability,spherical_harmonic_value,out=probability)
+	np.square(probability,out=probability)
+	#Mirrors the probability into the full grid.
+	return probability[np.ix_(x_mirror,y_mirror,z_mirror)]
+
+"""Encodes a 3D array of probabilities, indexed by [frame,row,column], as frames of ASCII characters. Returns a list containing each frame as bytes. Points flagged in nucleus are identified with an "N"."""
+def encode_frames(probability,nucleus):
+	#Looks up the ASCII character appropriate for each probability by binary search over the probability levels.
+	frame_characters=PROBABILITY_CHARACTERS[np.searchsorted(PROBABILITY_LEVELS,probability,side="right")-1]
+	frame_characters[nucleus]=b"N"
+	#Terminates each row with a newline, then reads out the characters of each frame as a single block of bytes.
+	newlines=np.full(frame_characters.shape[:2]+(1,),b"\n")
+	frame_characters=np.concatenate((frame_characters,newlines),axis=2)
+	frames=[frame.tobytes() for frame in frame_characters]
+	return frames
+
 """"Generates the animation of the atomic orbital."""
 def visualize_atomic_orbital(l,m,x_min,x_max,y_min,y_max,z_min,z_max,radial_decay_factor,viewplane):
 	#Defines the delay between each frame. 0.25 is recommended.
 	frame_delay=0.25
-	#Defines the ASCII characters which encode different probability levels.
-	probability_coding={
-	0.2:"$",
-	0.15:"O",
-	0.1:"o",
-	0.05:".",
-	0.0:" "
-	}
-	#Carries out the animation according to the user-specified viewing plane.
+	#Defines the coordinates along each axis according to the user-specified viewing plane. The animation steps through the axis perpendicular to the viewing plane. In each frame, rows run from the maximum of the vertical axis down to its minimum, and columns from the minimum of the horizontal axis up to its maximum. frame_axes orders the x, y, and z axes as frame, row, and column.
 	if viewplane=="xy":
-		for z in range(z_min,z_max):
-			#Populates a new frame with probability visualization data.
-			frame=""
-			for y in range(y_max,y_min,-1):
-				for x in range(x_min,x_max):
-					#If nucleus is encountered, identifies it with an "N".
-					if ((x==0) and (y==0) and (z==0)):
-						frame+="N"
-						continue
-					#Looks up the value of the spherical harmonic at the current point.
-					spherical_harmonic_value=real_spherical_harmonic_lookup(l,m,x,y,z)[1]
-					#Calculates distance of the point from the origin.
-					r=math.sqrt(float(x**2)+float(y**2)+float(z**2))
-					#Calculates the probability at this particular point.
-					probability=(spherical_harmonic_value*math.exp(-radial_decay_factor*r))**2
-					#Looks up the ASCII character appropriate for the current probability and writes it to the frame.
-					for magnitude in probability_coding:
-						if probability>=magnitude:
-							frame+=probability_coding[magnitude]
-							break
-				frame+="\n"
-			#Displays the frame for a short period.
-			print(frame)
-			time.sleep(frame_delay)
-	#Functionality is as described above.
+		x=np.arange(x_min,x_max)
+		y=np.arange(y_max,y_min,-1)
+		z=np.arange(z_min,z_max)
+		frame_axes=(2,1,0)
 	elif viewplane=="xz":
-		for y in range(y_min,y_max):
-			frame=""
-			for z in range(z_max,z_min,-1):
-				for x in range(x_min,x_max):
-					if ((x==0) and (y==0) and (z==0)):
-						frame+="N"
-						continue
-					r=math.sqrt(float(x**2)+float(y**2)+float(z**2))
-					spherical_harmonic_value=real_spherical_harmonic_lookup(l,m,x,y,z)[1]
-					probability=(spherical_harmonic_value*math.exp(-radial_decay_factor*r))**2
-					for magnitude in probability_coding:
-						if probability>=magnitude:
-							frame+=probability_coding[magnitude]
-							break
-				frame+="\n"
-			print(frame)
-			time.sleep(frame_delay)
+		x=np.arange(x_min,x_max)
+		y=np.arange(y_min,y_max)
+		z=np.arange(z_max,z_min,-1)
+		frame_axes=(1,2,0)
 	elif viewplane=="yz":
-		for x in range(x_min,x_max):
-			frame=""
-			for y in range(y_max,y_min,-1):
-				for z in range(z_min,z_max):
-					if ((x==0) and (y==0) and (z==0)):
-						frame+="N"
-						continue
-					r=math.sqrt(float(x**2)+float(y**2)+float(z**2))
-					spherical_harmonic_value=real_spherical_harmonic_lookup(l,m,x,y,z)[1]
-					probability=(spherical_harmonic_value*math.exp(-radial_decay_factor*r))**2
-					for magnitude in probability_coding:
-						if probability>=magnitude:
-							frame+=probability_coding[magnitude]
-							break
-				frame+="\n"
-			print(frame)
-			time.sleep(frame_delay)
+		x=np.arange(x_min,x_max)
+		y=np.arange(y_max,y_min,-1)
+		z=np.arange(z_min,z_max)
+		frame_axes=(0,1,2)
+	#Calculates the probability at each point of every frame.
+	probability=calculate_probability(l,m,x,y,z,radial_decay_factor).transpose(frame_axes)
+	#If nucleus is encountered, identifies it with an "N".
+	nucleus=((x==0)[:,np.newaxis,np.newaxis]&(y==0)[:,np.newaxis]&(z==0)).transpose(frame_axes)
+	#Populates every frame with probability visualization data before the animation begins, so that no work remains between frames.
+	frames=encode_frames(probability,nucleus)
+	#Writes the frames as bytes, bypassing text encoding, unless standard output only accepts text, as when it is redirected to a StringIO. In that case, the frames are decoded before the animation begins.
+	sys.stdout.flush()
+	if hasattr(sys.stdout,"buffer"):
+		output=sys.stdout.buffer
+		clear_screen,cursor_home=b"\x1b[2J",b"\x1b[H"
+	else:
+		output=sys.stdout
+		clear_screen,cursor_home="\x1b[2J","\x1b[H"
+		frames=[frame.decode("ascii") for frame in frames]
+	#Clears the terminal once; each frame is then drawn over the previous one.
+	output.write(clear_screen)
+	for frame in frames:
+		#Moves the cursor to the top left of the terminal and displays the frame for a short period. The frame is written in a single call, and flushed so that it appears before the delay.
+		output.write(cursor_home+frame)
+		output.flush()
+		time.sleep(frame_delay)
 
 """Validates all input. Returns False if an error is encountered, otherwise returns True."""
 def validate_input(l,m,x_min,x_max,y_min,y_max,z_min,z_max,radial_decay_factor,viewplane):
@@ -13,82 +13,89 @@ By default, NLTK's 'tokenize' supports English text, but appears to come with op
 """
 
 import os
+import numpy as np
 from nltk import tokenize
-from scipy import spatial
+from scipy import sparse
 
 """Imports the source text."""
 def import_source_text(source_text_path):
-	source_text_file=open(source_text_path,"r",encoding="utf8")
-	source_text=source_text_file.read().strip()
-	source_text_file.close()
-	return source_text
+	#Reads the file in a single call; the file is closed even if reading or decoding fails.
+	with open(source_text_path,"r",encoding="utf8") as source_text_file:
+		source_text=source_text_file.read()
+	return source_text.strip()
 
 """Identifies each sentence in the source text, returning them as a list."""
 def tokenize_by_sentence(source_text):
 	sentences=tokenize.sent_tokenize(source_text)
 	return sentences
 
-"""Identifies each unique word in the source text, returning them as a list."""
-def identify_unique_words(source_text):
-	words=tokenize.word_tokenize(source_text)
-	words=[word for word in words if word.isalnum()]
-	unique_words_in_source=list(set(words))
+"""Identifies the words in each sentence, returning them as a list of lists. Each sentence is tokenized exactly once; the result is shared by the steps which follow."""
+def tokenize_by_word(sentences):
+	words_in_sentences=[]
+	for sentence in sentences:
+		#Sentences have already been identified, so the sentence tokenizer is not run again on each one.
+		words=tokenize.word_tokenize(sentence,preserve_line=True)
+		words_in_sentences.append([word for word in words if word.isalnum()])
+	return words_in_sentences
+
+"""Identifies each unique word in the source text, returning them as a dict which maps each word to its position in the sentence vectors."""
+def identify_unique_words(words_in_sentences):
+	unique_words_in_source={}
+	for words in words_in_sentences:
+		for word in words:
+			if word not in unique_words_in_source:
+				unique_words_in_source[word]=len(unique_words_in_source)
 	return unique_words_in_source
 
-"""Converts sentences into vectors."""
-def vectorize_sentences(sentences,unique_words_in_source):
-	sentence_vectors=[]
-	#Iteratively vectorizes each sentence.
-	for i in range(0,len(sentences)):
-		#Tokenizes the current sentence.
-		words_in_current_sentence=tokenize.word_tokenize(sentences[i])
-		words_in_current_sentence=[word for word in words_in_current_sentence if word.isalnum()]
-		#Initializes the sentence vector.
-		sentence_vector=[]
-		for j in range(0,len(unique_words_in_source)):
-			sentence_vector.append(0)
-		#Constructs the sentence vector by tallying up the occurrence of each unique source-text word within the current sentence.
-		for j in range(0,len(words_in_current_sentence)):
-			for k in range(0,len(unique_words_in_source)):
-				if words_in_current_sentence[j]==unique_words_in_source[k]:
-					sentence_vector[k]+=1
-					break
-		sentence_vectors.append(sentence_vector)
+"""Converts sentences into vectors, returned as the rows of a sparse matrix."""
+def vectorize_sentences(words_in_sentences,unique_words_in_source):
+	#Records the sentence and the position of each word occurrence; repeated occurrences are tallied up when the matrix is constructed.
+	sentence_indices=[]
+	word_positions=[]
+	for i in range(0,len(words_in_sentences)):
+		for word in words_in_sentences[i]:
+			sentence_indices.append(i)
+			word_positions.append(unique_words_in_source[word])
+	#Constructs the sentence vectors, storing only the nonzero counts.
+	sentence_vectors=sparse.csr_array((np.ones(len(word_positions)),(sentence_indices,word_positions)),shape=(len(words_in_sentences),len(unique_words_in_source)))
 	#Returns the sentence vectors.
 	return sentence_vectors
 
 """
 Uses an implementation of the TextRank algorithm to identify key sentences.
 
-The average cosine similarities of each sentence are calculated and ranked. Those with the highest average cosine similarities are presumed to be the most 'central' to the meaning of the text.
+The average cosine similarity of each sentence to every other is calculated, and returned as an array in sentence order. Those with the highest average cosine similarities are presumed to be the most 'central' to the meaning of the text.
 """
 def textrank(sentence_vectors):
-	#Initializes the average similiarity list.
-	average_similarities=[]
-	for i in range(0,len(sentence_vectors)):
-		average_similarities.append([i,0.0])
-	#Populates the average similiarity list.
-	for i in range(0,len(sentence_vectors)):
-		for j in range(0,len(sentence_vectors)):
-			if i==j:
-				continue
-			else:
-				similarity=1.0-spatial.distance.cosine(sentence_vectors[i],sentence_vectors[j])
-				average_similarities[i][1]+=similarity
-	for i in range(0,len(average_similarities)):
-		average_similarities[i][1]/=(len(sentence_vectors)-1)
-	#Ranks the average similarity list in descending order.
-	average_similarities=sorted(average_similarities,key=lambda l:l[1],reverse=True)
-	#Returns the average similarity list.
+	#Scales each sentence vector to unit length, so that the dot product of any two is their cosine similarity. Sentences without any words are left as zero vectors, and so have zero similarity with every other sentence.
+	norms=np.sqrt(sentence_vectors.multiply(sentence_vectors).sum(axis=1))
+	norms[norms==0]=1.0
+	sentence_vectors=sparse.csr_array(sentence_vectors.multiply(1.0/norms[:,np.newaxis]))
+	#Calculates the cosine similarity of every pair of sentences in a single sparse matrix product, discarding the similarity of each sentence with itself.
+	similarities=(sentence_vectors@sentence_vectors.T).toarray()
+	np.fill_diagonal(similarities,0.0)
+	#Calculates the average similarity of each sentence.
+	average_similarities=similarities.sum(axis=1)/(sentence_vectors.shape[0]-1)
 	return average_similarities
 
-"""Generates an extractive summary of the input text according to a user-specified compression ratio."""
+"""
+Generates an extractive summary of the input text according to a user-specified compression ratio.
+
+Only the most central sentences are needed, so the sentences are not ranked in full. The lowest average similarity which still qualifies is found by partitioning, and ties at that score are resolved in favour of the earliest sentences.
+"""
 def generate_summary(sentences,average_similarities,compression_ratio):
-	summary=""
-	sentences_to_keep=sorted(average_similarities[0:int(len(average_similarities)*(1-compression_ratio))],key=lambda l:l[0])
-	for sentence in sentences_to_keep:
-		summary+=sentences[sentence[0]]+" "
-	summary=summary.strip()
+	sentence_count=int(len(average_similarities)*(1-compression_ratio))
+	if sentence_count==0:
+		return ""
+	#Identifies the lowest average similarity among the sentences to keep.
+	threshold=-np.partition(-average_similarities,sentence_count-1)[sentence_count-1]
+	#Treats average similarities which differ from the threshold only by rounding error as tied with it. Identical sentences are summed in a different order, so their averages can differ in the last few bits.
+	at_threshold=np.isclose(average_similarities,threshold,rtol=1e-9,atol=1e-12)
+	#Keeps every sentence above the threshold, and as many of the earliest sentences at the threshold as are needed. Sentences are kept in their original order.
+	sentences_above_threshold=np.flatnonzero((average_similarities>threshold)&~at_threshold)
+	sentences_at_threshold=np.flatnonzero(at_threshold)[:sentence_count-len(sentences_above_threshold)]
+	sentences_to_keep=np.union1d(sentences_above_threshold,sentences_at_threshold)
+	summary=" ".join(sentences[i] for i in sentences_to_keep).strip()
 	return summary
 
 """Validates all input. Returns False if an error is encountered, otherwise returns True."""
@@ -124,14 +131,15 @@ def main():
 	if source_text=="":
 		#Terminates if the source text is an empty string.
 		return -1
-	#Tokenizes the source text into its sentences and unique words.
+	#Tokenizes the source text into its sentences, the words of each sentence, and its unique words.
 	sentences=tokenize_by_sentence(source_text)
 	if len(sentences)<2:
 		#Terminates if sentence count is less than 2, since cosine similiarity cannot be calculated in this case.
 		return -1
-	unique_words_in_source=identify_unique_words(source_text)
+	words_in_sentences=tokenize_by_word(sentences)
+	unique_words_in_source=identify_unique_words(words_in_sentences)
 	#Vectorizes the sentences.
-	sentence_vectors=vectorize_sentences(sentences,unique_words_in_source)
+	sentence_vectors=vectorize_sentences(words_in_sentences,unique_words_in_source)
 	#Invokes TextRank.
 	average_similarities=textrank(sentence_vectors)
 	#Generates and prints the summary.
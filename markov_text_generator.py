@@ -5,101 +5,255 @@ The statistical structure of the input corpus is analyzed and transition probabi
 
 The user specifies the path of the input corpus, the length of the n-grams to analyze, and the length of the output.
 
-Only a single .txt files formatted in UTF-8 is accepted as input.
+Only a single .txt files formatted in UTF-8 is accepted as input. Words are taken to be runs of letters and digits; all other characters are discarded.
+
+The transition probabilities calculated from a corpus are cached in '~/.cache/markov_text_generator', so later runs on the same corpus and n-gram length go straight to generating text. The cache may be deleted at any time.
 
 The larger the corpus, the better the results, however the program will still function with smaller inputs. For an input the length of a typical news article, n-grams of length 6 appear to offer the best trade-off between syntatical coherency and the originality of the output. Shorter n-grams tend to produce gibberish, whereas longer ones tend to yield long word runs identical to the input.
 """
 
-import os,random
-from nltk import tokenize
+import hashlib,numbers,operator,os,re,zipfile
+import numpy as np
+
+#Matches a single word: a run of letters and digits.
+WORD_PATTERN=re.compile(r"[^\W_]+")
+
+#The base of the polynomial hash used to count n-grams which are too long to pack into 64 bits.
+N_GRAM_HASH_BASE=np.uint64(1000003)
+
+#Generates the random numbers used to draw n-grams.
+RANDOM_NUMBER_GENERATOR=np.random.default_rng()
+
+#The directory in which the alias tables of each corpus are cached between runs.
+CACHE_DIRECTORY=os.path.join(os.path.expanduser("~"),".cache","markov_text_generator")
+
+#Identifies the layout of the cached alias tables. Changing the layout requires changing this, so that stale caches are never read.
+CACHE_FORMAT=b"markov_text_generator alias tables 2"
+
+#The number of bytes of the corpus read at a time when it is hashed.
+CACHE_HASH_CHUNK_SIZE=1<<20
 
-"""Imports the corpus."""
+"""Imports the corpus, yielding it one line at a time so that the full text is never held in memory at once."""
 def import_corpus(corpus_path):
-	corpus_file=open(corpus_path,"r",encoding="utf8")
-	corpus=corpus_file.read().strip()
-	corpus_file.close()
-	return corpus
+	with open(corpus_path,"r",encoding="utf8") as corpus_file:
+		yield from corpus_file
 
-"""Tokenizes the corpus."""
+"""Tokenizes the corpus, given as an iterable of lines, in a single pass over the text. Words never span lines, so each line is tokenized on its own."""
 def tokenize_corpus(corpus):
-	words=tokenize.word_tokenize(corpus)
-	words=[word for word in words if word.isalnum()]
+	words=[]
+	for line in corpus:
+		words+=WORD_PATTERN.findall(line)
 	return words
 
-"""Calculates n-gram frequencies."""
-def calculate_n_gram_frequencies(words,n):
-	n_gram_frequencies={}
-	#Counts the occurrence of each n-gram.
-	word_index=n
-	while word_index<len(words):
-		n_gram=tuple(words[word_index-n:word_index])
-		if n_gram in list(n_gram_frequencies.keys()):
-			n_gram_frequencies[n_gram]+=1
+"""Encodes each word of the corpus as an integer ID. Returns the vocabulary, listing each unique word at the position of its ID, along with the IDs of the words in the corpus."""
+def encode_words(words):
+	word_ids_by_word={}
+	for word in words:
+		if word not in word_ids_by_word:
+			word_ids_by_word[word]=len(word_ids_by_word)
+	vocabulary=list(word_ids_by_word)
+	word_ids=np.fromiter((word_ids_by_word[word] for word in words),dtype=np.int32,count=len(words))
+	return vocabulary,word_ids
+
+"""Calculates n-gram frequencies, as the number of times each n-gram of word IDs occurs in the corpus. Returns a tuple containing an array of the distinct n-grams, one per row and sorted in ascending order, and an array of their counts. The counts are left unnormalized, since only their ratios are used."""
+def calculate_n_gram_frequencies(word_ids,n):
+	#Counts every n-gram, up to and including the one which ends the corpus.
+	n_gram_count=max(len(word_ids)-n+1,0)
+	#Determines the number of bits needed to hold any word ID.
+	bits_per_word=max(int(word_ids.max(initial=0)).bit_length(),1)
+	if n*bits_per_word<=64:
+		#Packs each n-gram into a single 64-bit key, its initial word in the highest bits, so that the n-grams can be counted in one vectorized pass.
+		keys=np.zeros(n_gram_count,dtype=np.uint64)
+		for offset in range(n):
+			keys<<=np.uint64(bits_per_word)
+			keys|=word_ids[offset:offset+n_gram_count].astype(np.uint64)
+		keys,n_gram_frequencies=np.unique(keys,return_counts=True)
+		#Unpacks each distinct key back into its n-gram.
+		mask=np.uint64((1<<bits_per_word)-1)
+		n_grams=np.empty((len(keys),n),dtype=np.int64)
+		for offset in range(n):
+			n_grams[:,offset]=(keys>>np.uint64(bits_per_word*(n-1-offset)))&mask
+	else:
+		#If the n-grams are too long to pack, hashes each one instead, accumulating a polynomial hash word by word with arithmetic wrapping around at 64 bits.
+		keys=np.zeros(n_gram_count,dtype=np.uint64)
+		for offset in range(n):
+			keys*=N_GRAM_HASH_BASE
+			keys+=word_ids[offset:offset+n_gram_count].astype(np.uint64)
+		keys,first_occurrences,key_indices,n_gram_frequencies=np.unique(keys,return_index=True,return_inverse=True,return_counts=True)
+		#Reads each distinct n-gram off the corpus at its first occurrence.
+		if n_gram_count>0:
+			windows=np.lib.stride_tricks.sliding_window_view(word_ids,n)
+		else:
+			windows=np.empty((0,n),dtype=word_ids.dtype)
+		n_grams=windows[first_occurrences]
+		if np.array_equal(windows,n_grams[key_indices]):
+			#Sorts the n-grams, since hashing does not preserve their order.
+			order=np.lexsort(n_grams.T[::-1])
+			n_grams=n_grams[order].astype(np.int64)
+			n_gram_frequencies=n_gram_frequencies[order]
 		else:
-			n_gram_frequencies[n_gram]=1
-		word_index+=1
-	#Calculates the frequency of each n-gram.
-	unique_n_grams=len(n_gram_frequencies)
-	for n_gram in n_gram_frequencies:
-		n_gram_frequencies[n_gram]/=unique_n_grams
-	return n_gram_frequencies
-
-"""Calculates the transitional probabilities of each n-gram given the occurrence of its inital word in the corpus."""
-def calculate_n_gram_probabilities(n_gram_frequencies,word_frequencies):
-	transitional_n_gram_probabilities=[]
-	for n_gram in n_gram_frequencies:
-		n_gram_frequency=n_gram_frequencies[n_gram]
-		initial_word=tuple([n_gram[0]])
-		initial_word_frequency=word_frequencies[initial_word]
-		transitional_n_gram_probability=n_gram_frequency/initial_word_frequency
-		transitional_n_gram_probabilities.append([n_gram,transitional_n_gram_probability])
-	return transitional_n_gram_probabilities
-
-"""Generates a string of random text based on the transition probabilities of each n-gram in the corpus."""
-def generate_random_string(transitional_n_gram_probabilities,maximum_length):
-	generated_words=[]
-	#Randomly selects the initial n-gram.
-	initial_n_gram=list(random.choice(transitional_n_gram_probabilities)[0])
-	generated_words+=initial_n_gram
+			#Two distinct n-grams share a hash, so counts the n-grams by comparing them in full instead.
+			n_grams,n_gram_frequencies=np.unique(windows,axis=0,return_counts=True)
+			n_grams=n_grams.astype(np.int64)
+	return n_grams,n_gram_frequencies
+
+"""
+Calculates the transitional probabilities of each n-gram given the occurrence of its inital word in the corpus, as the ratio of their counts. The probabilities are calculated for all n-grams at once.
+
+The occurrences of each initial word are totalled from the n-gram counts themselves, so the corpus is only counted once. Only occurrences which begin an n-gram are included, so that the probabilities of the n-grams beginning with each word add up to 1.
+
+The n-grams are indexed by initial word in compressed sparse row layout, so that all candidates to follow a word can be looked up directly. Returns a tuple containing three arrays: word_offsets, where the candidates to follow the word with ID i occupy rows word_offsets[i] up to word_offsets[i+1] of the other two arrays; the remaining words of each n-gram, one per row; and the transitional probability of each n-gram.
+"""
+def calculate_n_gram_probabilities(n_gram_frequencies,vocabulary_size):
+	n_grams,n_gram_counts=n_gram_frequencies
+	#Totals the count of each initial word, then looks it up for every n-gram.
+	initial_words=n_grams[:,0]
+	word_counts=np.bincount(initial_words,weights=n_gram_counts,minlength=vocabulary_size)
+	transitional_n_gram_probabilities=n_gram_counts/word_counts[initial_words]
+	#The n-grams are sorted, so those sharing an initial word are contiguous. Locates where the n-grams of each word begin and end.
+	word_offsets=np.searchsorted(initial_words,np.arange(vocabulary_size+1))
+	continuations=n_grams[:,1:]
+	return word_offsets,continuations,transitional_n_gram_probabilities
+
+"""
+Constructs an alias table over the n-grams which may follow each word, using Vose's alias method. The tables of all words are stored end to end, in the same layout as the transitional probabilities. Returns a tuple containing word_offsets, the remaining words of each n-gram, the probability of keeping each column of the tables, and the alias of each column.
+
+Once the tables are constructed, an n-gram is drawn in constant time: a column is picked uniformly at random from the preceding word's table, then either its own n-gram or its alias is taken according to the column's probability.
+"""
+def build_alias_tables(transitional_n_gram_probabilities):
+	word_offsets,continuations,probabilities=transitional_n_gram_probabilities
+	keep_probabilities=probabilities.tolist()
+	aliases=list(range(len(keep_probabilities)))
+	for table_start,table_end in zip(word_offsets[:-1].tolist(),word_offsets[1:].tolist()):
+		#Scales the probabilities so that they average 1, then sorts the columns into those which fall short of 1 and those which do not.
+		column_count=table_end-table_start
+		total_probability=sum(keep_probabilities[table_start:table_end])
+		for i in range(table_start,table_end):
+			keep_probabilities[i]=keep_probabilities[i]*column_count/total_probability
+		small=[i for i in range(table_start,table_end) if keep_probabilities[i]<1.0]
+		large=[i for i in range(table_start,table_end) if keep_probabilities[i]>=1.0]
+		#Fills each short column with the excess of a full one, which becomes its alias.
+		while small and large:
+			short_column=small.pop()
+			full_column=large.pop()
+			aliases[short_column]=full_column
+			keep_probabilities[full_column]=(keep_probabilities[full_column]+keep_probabilities[short_column])-1.0
+			if keep_probabilities[full_column]<1.0:
+				small.append(full_column)
+			else:
+				large.append(full_column)
+		#Any columns left over are full, save for rounding error.
+		for i in small+large:
+			keep_probabilities[i]=1.0
+	return word_offsets,continuations,np.array(keep_probabilities),np.array(aliases,dtype=np.int64)
+
+"""Generates a string of random text based on the transition probabilities of each n-gram in the corpus, drawing from the alias tables. Word IDs are converted back to words through the vocabulary."""
+def generate_random_string(alias_tables,vocabulary,maximum_length):
+	word_offsets,continuations,keep_probabilities,aliases=alias_tables
+	#Calculates in advance how many n-grams are to be added: each contributes all but its initial word, until maximum length is exceeded. Fewer are kept if the chain restarts, since the n-gram at a restart contributes every word.
+	continuation_length=continuations.shape[1]
+	n=continuation_length+1
+	n_gram_count=max((maximum_length-n)//continuation_length+1,0)
+	#Converts the tables read at every step to lists once, since single elements are read from lists faster than from arrays. Only the final word of each n-gram is needed to continue the sequence.
+	final_words=continuations[:,-1].tolist()
+	table_offsets=word_offsets.tolist()
+	column_keep_probabilities=keep_probabilities.tolist()
+	column_aliases=aliases.tolist()
+	#Draws all random numbers needed in two batches up front: an integer from which each column is picked, and a probability against which each column is kept or swapped for its alias. The integers span 63 bits, so reducing them modulo the size of a table introduces no meaningful bias.
+	column_draws=RANDOM_NUMBER_GENERATOR.integers(0,2**63-1,size=n_gram_count+1,dtype=np.int64).tolist()
+	keep_draws=RANDOM_NUMBER_GENERATOR.random(n_gram_count+1).tolist()
+	#Randomly selects the initial n-gram. Only the row of each chosen n-gram is recorded while the chain is walked, along with the steps at which the chain starts or restarts.
+	chosen_columns=[0]*(n_gram_count+1)
+	restarts=[0]
+	column=column_draws[0]%len(final_words)
+	chosen_columns[0]=column
+	preceding_word=final_words[column]
 	#Randomly adds additional n-grams to the sequence given their transitional probabilities, until maximum length is reached.
-	generated_words_index=len(generated_words)
-	while len(generated_words)<=maximum_length:
-		#Identifies all candidate n-grams to continue the sequence.
-		preceding_word=generated_words[-1]
-		candidate_n_grams=[]
-		for i in range(0,len(transitional_n_gram_probabilities)):
-			n_gram=transitional_n_gram_probabilities[i][0]
-			transitional_n_gram_probability=transitional_n_gram_probabilities[i][1]
-			if preceding_word==n_gram[0]:
-				candidate_n_grams.append([i,transitional_n_gram_probability])
-		#Randomly selects one of the candidate n-grams according to transition probability given the preceding word.
-		chosen_n_gram=random.choices([row[0] for row in candidate_n_grams],[row[1] for row in candidate_n_grams])
-		#Appends chosen n-gram to the sequence.
-		generated_words+=transitional_n_gram_probabilities[chosen_n_gram[0]][0][1:]
+	for i in range(1,n_gram_count+1):
+		#Locates the alias table of all candidate n-grams to continue the sequence.
+		table_start=table_offsets[preceding_word]
+		table_size=table_offsets[preceding_word+1]-table_start
+		if table_size==0:
+			#The preceding word occurs only at the end of the corpus, so no n-gram continues from it. The chain restarts from an n-gram selected uniformly at random, which is output in full, initial word included, as at the start of the sequence. Only the pair of words either side of a restart does not occur in the corpus.
+			column=column_draws[i]%len(final_words)
+			restarts.append(i)
+		else:
+			#Randomly selects one of the candidate n-grams according to transition probability given the preceding word.
+			column=table_start+column_draws[i]%table_size
+			if keep_draws[i]>=column_keep_probabilities[column]:
+				column=column_aliases[column]
+		chosen_columns[i]=column
+		preceding_word=final_words[column]
+	#Each restart contributes one word more than a continuation, so maximum length may be exceeded before every step has been taken. The steps beyond that point are discarded.
+	if len(restarts)>1:
+		step_lengths=np.full(n_gram_count+1,continuation_length)
+		step_lengths[restarts]=n
+		step_count=min(int(np.searchsorted(np.cumsum(step_lengths),maximum_length,side="right"))+1,n_gram_count+1)
+		chosen_columns=chosen_columns[:step_count]
+		restarts=[step for step in restarts if step<step_count]
+	#Assembles the generated sequence in a single gather: the remaining words of every chosen n-gram, with the initial word of each n-gram at a start or restart inserted before them.
+	initial_words=np.searchsorted(word_offsets,[chosen_columns[step] for step in restarts],side="right")-1
+	generated_words=np.insert(continuations[chosen_columns].ravel(),np.array(restarts)*continuation_length,initial_words)
 	#Converts the generated sequence to a string.
-	generated_string=" ".join(generated_words).lower()
+	generated_string=" ".join(map(vocabulary.__getitem__,generated_words.tolist())).lower()
 	return generated_string
 
+"""Identifies the cache of a given corpus and n-gram length, returning the path at which its alias tables are stored. The corpus is hashed in chunks, so that it is never held in memory at once."""
+def locate_cache(corpus_path,n):
+	corpus_hash=hashlib.sha256(CACHE_FORMAT)
+	with open(corpus_path,"rb") as corpus_file:
+		for chunk in iter(lambda:corpus_file.read(CACHE_HASH_CHUNK_SIZE),b""):
+			corpus_hash.update(chunk)
+	corpus_hash.update(b"\0"+str(n).encode())
+	cache_path=os.path.join(CACHE_DIRECTORY,corpus_hash.hexdigest()+".npz")
+	return cache_path
+
+"""Loads the vocabulary and alias tables cached at a given path. Returns None if no usable cache exists, including one which is empty or corrupt, in which case the tables must be built from the corpus."""
+def load_cache(cache_path):
+	try:
+		with np.load(cache_path) as cache:
+			vocabulary_text=cache["vocabulary"].tobytes().decode("utf8")
+			alias_tables=(cache["word_offsets"],cache["continuations"],cache["keep_probabilities"],cache["aliases"])
+	except (OSError,EOFError,KeyError,ValueError,zipfile.BadZipFile):
+		return None
+	vocabulary=vocabulary_text.split("\n") if vocabulary_text else []
+	return vocabulary,alias_tables
+
+"""Caches the vocabulary and alias tables at a given path. The cache is written to a temporary file, then moved into place, so that an interrupted run never leaves a partial cache behind. Failing to write the cache is not an error, since it only serves to speed up later runs."""
+def save_cache(cache_path,vocabulary,alias_tables):
+	word_offsets,continuations,keep_probabilities,aliases=alias_tables
+	#Stores the vocabulary as a single buffer of UTF-8 text, one word per line, so that its size is that of the words themselves. Words never contain line breaks.
+	vocabulary_text=np.frombuffer("\n".join(vocabulary).encode("utf8"),dtype=np.uint8)
+	temporary_path=cache_path+".%d.tmp"%os.getpid()
+	try:
+		os.makedirs(os.path.dirname(cache_path),exist_ok=True)
+		with open(temporary_path,"wb") as cache_file:
+			np.savez(cache_file,vocabulary=vocabulary_text,word_offsets=word_offsets,continuations=continuations,keep_probabilities=keep_probabilities,aliases=aliases)
+		os.replace(temporary_path,cache_path)
+	except OSError:
+		if os.path.exists(temporary_path):
+			os.remove(temporary_path)
+
 """Validates all input. Returns False if an error is encountered, otherwise returns True."""
 def validate_input(corpus_path,n,maximum_length):
-	#Ensures corpus_path exists.
-	if not os.path.exists(corpus_path):
-		print("Error. Corpus file path does not exist.")
-		return False
-	#Ensures n is an integer greater than 0.
-	if type(n)!=int:
+	#Ensures n is an integer greater than 1. Any integral type is accepted, but booleans are not.
+	if not isinstance(n,numbers.Integral) or isinstance(n,bool):
 		print("Error. n must be an integer.")
 		return False
 	elif n<=1:
 		print("Error. n must be greater than 1.")
 		return False
 	#Ensures maximum_length is an integer greater than 0.
-	if type(maximum_length)!=int:
+	if not isinstance(maximum_length,numbers.Integral) or isinstance(maximum_length,bool):
 		print("Error. maximum_length must be an integer.")
 		return False
 	elif maximum_length<=0:
 		print("Error. maximum_length must be greater than 0.")
 		return False
+	#Ensures corpus_path exists and is a file. This is checked last, since it queries the file system.
+	if not os.path.isfile(corpus_path):
+		print("Error. Corpus file path does not exist or is not a file.")
+		return False
 	#Returns True if all input is valid.
 	return True
 
@@ -111,15 +265,31 @@ def main():
 	#Validates input.
 	if not validate_input(corpus_path,n,maximum_length):
 		return -1
-	#Loads and tokenizes the corpus.
-	corpus=import_corpus(corpus_path)
-	words=tokenize_corpus(corpus)
-	#Calculates transition probabilities between each n-gram in the corpus.
-	n_gram_frequencies=calculate_n_gram_frequencies(words,n)
-	word_frequencies=calculate_n_gram_frequencies(words,1)
-	transitional_n_gram_probabilities=calculate_n_gram_probabilities(n_gram_frequencies,word_frequencies)
+	#Converts n and maximum_length to Python integers, since integral types of fixed width, such as those of NumPy, would overflow when combined with the length of the corpus.
+	n=operator.index(n)
+	maximum_length=operator.index(maximum_length)
+	#Loads the alias tables cached by an earlier run on the same corpus and n, if there are any.
+	cache_path=locate_cache(corpus_path,n)
+	cache=load_cache(cache_path)
+	if cache is not None:
+		vocabulary,alias_tables=cache
+	else:
+		#Loads and tokenizes the corpus, then encodes each word as an integer ID.
+		corpus=import_corpus(corpus_path)
+		words=tokenize_corpus(corpus)
+		vocabulary,word_ids=encode_words(words)
+		#Calculates transition probabilities between each n-gram in the corpus.
+		n_gram_frequencies=calculate_n_gram_frequencies(word_ids,n)
+		if len(n_gram_frequencies[1])==0:
+			#Terminates if the corpus is too short to contain a single n-gram, since there is nothing to generate text from.
+			print("Error. Corpus must contain at least n words.")
+			return -1
+		transitional_n_gram_probabilities=calculate_n_gram_probabilities(n_gram_frequencies,len(vocabulary))
+		alias_tables=build_alias_tables(transitional_n_gram_probabilities)
+		#Caches the alias tables for later runs.
+		save_cache(cache_path,vocabulary,alias_tables)
 	#Generates random text.
-	generated_string=generate_random_string(transitional_n_gram_probabilities,maximum_length)
+	generated_string=generate_random_string(alias_tables,vocabulary,maximum_length)
 	print(generated_string)
 	return 0
 